@@ -0,0 +1,319 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+
+class AggregationError(ValueError):
+    """Raised for aggregation requests that do not fit the stored result"""
+
+
+class ResultStore:
+    """Keeps recent execution results server-side for the dashboard
+
+    put() stores the DataFrame and precomputes per-column summary statistics;
+    aggregate() answers group-by, histogram, top-N and time-bucket requests
+    with at most max_points values, so the browser never receives raw rows.
+    pandas and numpy are imported on use to keep application startup light.
+    """
+
+    AGGREGATIONS = ('count', 'sum', 'mean', 'min', 'max', 'median', 'nunique')
+
+    # Value kinds each aggregation accepts; count and nunique work on anything
+    AGGREGATION_KINDS = {
+        'sum': ('numeric',),
+        'mean': ('numeric', 'datetime'),
+        'median': ('numeric', 'datetime'),
+        'min': ('numeric', 'datetime'),
+        'max': ('numeric', 'datetime')
+    }
+
+    # Candidate time buckets for automatic downsampling, smallest first
+    TIME_BUCKETS = ['s', 'min', 'h', 'D', 'W', 'MS', 'QS', 'YS']
+
+    def __init__(self, max_results=None, max_points=None):
+        self.max_results = max_results or int(os.environ.get('RESULT_STORE_MAX', 8))
+        self.max_points = max_points or int(os.environ.get('DASHBOARD_MAX_POINTS', 500))
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, df, query=None):
+        """Store an execution result and return its id"""
+        start_time = time.time()
+        # Work on a copy, the caller still renders the original frame
+        df = self._normalise(df.copy())
+        entry = {
+            'df': df,
+            'query': query,
+            'rows': len(df),
+            'created_at': time.time(),
+            'summary': self._summarise(df)
+        }
+        entry['summary_ms'] = round((time.time() - start_time) * 1000, 2)
+
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._results[result_id] = entry
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result_id
+
+    def get(self, result_id):
+        with self._lock:
+            if result_id not in self._results:
+                raise AggregationError('Result is no longer available, please run the query again.')
+            self._results.move_to_end(result_id)
+            return self._results[result_id]
+
+    def summary(self, result_id):
+        """Precomputed column statistics for a stored result"""
+        entry = self.get(result_id)
+        return {
+            'result_id': result_id,
+            'query': entry['query'],
+            'rows': entry['rows'],
+            'summary_ms': entry['summary_ms'],
+            'columns': entry['summary']
+        }
+
+    @staticmethod
+    def _normalise(df):
+        import pandas as pd
+        # MySQL DECIMAL and DATE columns arrive as object columns of Decimal / date
+        for col in df.columns:
+            if df[col].dtype == object:
+                first = df[col].first_valid_index()
+                if first is None:
+                    continue
+                if isinstance(df[col][first], Decimal):
+                    df[col] = df[col].astype(float)
+                elif isinstance(df[col][first], date):
+                    df[col] = pd.to_datetime(df[col], errors='coerce')
+        return df
+
+    @staticmethod
+    def _kind(series):
+        import pandas as pd
+        if pd.api.types.is_bool_dtype(series):
+            return 'categorical'
+        if pd.api.types.is_numeric_dtype(series):
+            return 'numeric'
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return 'datetime'
+        return 'categorical'
+
+    def _summarise(self, df):
+        summary = {}
+        nulls = df.isna().sum()
+        kinds = {col: self._kind(df[col]) for col in df.columns}
+
+        numeric = [col for col, kind in kinds.items() if kind == 'numeric']
+        described = df[numeric].describe().T if numeric else None
+
+        for col in df.columns:
+            stats = {
+                'kind': kinds[col],
+                'dtype': str(df[col].dtype),
+                'count': int(len(df) - nulls[col]),
+                'nulls': int(nulls[col])
+            }
+            if kinds[col] == 'numeric':
+                row = described.loc[col]
+                for key in ('min', '25%', '50%', '75%', 'max', 'mean', 'std'):
+                    stats[key] = self._scalar(row[key])
+            elif kinds[col] == 'datetime':
+                stats['min'] = self._scalar(df[col].min())
+                stats['max'] = self._scalar(df[col].max())
+            else:
+                values = df[col].astype(str).where(df[col].notna())
+                counts = values.value_counts()
+                stats['distinct'] = int(len(counts))
+                stats['top'] = [{'value': value, 'count': int(count)} for value, count in counts.head(5).items()]
+            summary[col] = stats
+        return summary
+
+    @staticmethod
+    def _scalar(value):
+        """JSON-friendly version of a numpy / pandas scalar"""
+        import pandas as pd
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        if isinstance(value, pd.Timestamp):
+            return value.isoformat()
+        if hasattr(value, 'item'):
+            return value.item()
+        return value
+
+    def _column(self, df, params, key='column', required=True):
+        column = params.get(key)
+        if column is None and not required:
+            return None
+        if not isinstance(column, str) or column not in df.columns:
+            raise AggregationError(f'Unknown column: {column}')
+        return column
+
+    def _agg(self, params, df=None, column=None, default='count'):
+        agg = params.get('agg') or default
+        if agg not in self.AGGREGATIONS:
+            raise AggregationError(f'Unsupported aggregation: {agg}')
+        if column is None:
+            if agg != 'count':
+                raise AggregationError(f'{agg} needs a value column')
+        elif agg in self.AGGREGATION_KINDS:
+            kind = self._kind(df[column])
+            if kind not in self.AGGREGATION_KINDS[agg]:
+                raise AggregationError(f'{agg} is not supported on {kind} column {column}')
+        return agg
+
+    def _limit(self, params, default=None):
+        try:
+            limit = int(params.get('limit') or default or self.max_points)
+        except (TypeError, ValueError):
+            raise AggregationError('limit must be an integer')
+        return max(1, min(limit, self.max_points))
+
+    def aggregate(self, result_id, params):
+        """Run one aggregation over a stored result and return chart-ready series"""
+        entry = self.get(result_id)
+        operations = {
+            'groupby': self._groupby,
+            'histogram': self._histogram,
+            'topn': self._topn,
+            'timeseries': self._timeseries
+        }
+        op = params.get('op')
+        if op not in operations:
+            raise AggregationError(f'Unsupported operation: {op}')
+
+        start_time = time.time()
+        result = operations[op](entry['df'], params)
+        result.update({
+            'op': op,
+            'rows': entry['rows'],
+            'points': len(result['labels']),
+            'elapsed_ms': round((time.time() - start_time) * 1000, 2)
+        })
+        return result
+
+    def _series(self, series):
+        return {
+            'labels': [self._label(label) for label in series.index],
+            'values': [self._scalar(value) for value in series.tolist()]
+        }
+
+    def _label(self, label):
+        if isinstance(label, tuple):
+            return ' / '.join(str(self._scalar(part)) for part in label)
+        return str(self._scalar(label))
+
+    def _grouped(self, df, by, column, agg):
+        grouped = df.groupby(by, observed=True, sort=False, dropna=False)
+        if column is None:
+            return grouped.size()
+        return grouped[column].agg(agg)
+
+    def _groupby(self, df, params):
+        by = params.get('by')
+        by = [by] if isinstance(by, str) else by
+        if not by or not isinstance(by, list):
+            raise AggregationError('groupby needs at least one "by" column')
+        for col in by:
+            self._column(df, {'column': col})
+        column = self._column(df, params, required=False)
+        agg = self._agg(params, df, column)
+
+        series = self._grouped(df, by, column, agg)
+        total_groups = len(series)
+        series = series.sort_values(ascending=False).head(self._limit(params))
+        result = self._series(series)
+        result['groups'] = total_groups
+        return result
+
+    def _histogram(self, df, params):
+        import numpy as np
+        column = self._column(df, params)
+        if self._kind(df[column]) != 'numeric':
+            raise AggregationError(f'{column} is not numeric, use topn or timeseries instead')
+        values = df[column].dropna().to_numpy(dtype=float)
+        bins = self._limit(params, default=params.get('bins') or 20)
+
+        if len(values) == 0:
+            return {'labels': [], 'values': []}
+        counts, edges = np.histogram(values, bins=bins)
+        return {
+            'labels': [f'{edges[i]:.4g} - {edges[i + 1]:.4g}' for i in range(len(counts))],
+            'values': counts.tolist(),
+            'edges': edges.tolist()
+        }
+
+    def _topn(self, df, params):
+        column = self._column(df, params)
+        value = self._column(df, params, key='value', required=False)
+        agg = self._agg(params, df, value, default='count' if value is None else 'sum')
+        n = self._limit(params, default=params.get('n') or 10)
+
+        series = self._grouped(df, column, value, agg)
+        top = series.nlargest(n)
+        result = self._series(top)
+        if agg in ('count', 'sum') and len(series) > n:
+            result['other'] = self._scalar(series.sum() - top.sum())
+        return result
+
+    def _timeseries(self, df, params):
+        import pandas as pd
+        column = self._column(df, params)
+        value = self._column(df, params, key='value', required=False)
+        agg = self._agg(params, df, value, default='count' if value is None else 'mean')
+
+        times = df[column]
+        if self._kind(times) != 'datetime':
+            times = pd.to_datetime(times, errors='coerce')
+        frame = pd.DataFrame({'t': times, 'v': df[value] if value is not None else 0}).dropna(subset=['t'])
+        if frame.empty:
+            return {'labels': [], 'values': [], 'freq': None}
+
+        limit = self._limit(params)
+        freq = params.get('freq') or self._auto_freq(frame['t'], limit)
+        buckets = self._bucket_count(frame['t'], freq, limit)
+        if buckets is None or buckets > limit:
+            raise AggregationError(f'{freq} buckets give more than the limit of {limit} points')
+        resampled = frame.set_index('t')['v'].resample(freq)
+        series = resampled.size() if value is None else resampled.agg(agg)
+
+        result = self._series(series)
+        result['freq'] = freq
+        return result
+
+    @staticmethod
+    def _bucket_count(times, freq, limit):
+        """Buckets resample() will produce, or None when freq clearly gives more than limit
+
+        Resampling the two end points counts partial and anchored edge buckets
+        exactly, but materialises every bucket in between, so the span is first
+        checked against the step length. Calendar offsets (months, business
+        days) vary in length, hence the generous margin.
+        """
+        import pandas as pd
+        start, end = times.min(), times.max()
+        try:
+            offset = pd.tseries.frequencies.to_offset(freq)
+            step = ((start + 2 * offset) - (start + offset)).total_seconds()
+        except (ValueError, TypeError, OverflowError):
+            raise AggregationError(f'Invalid frequency: {freq}')
+        if step <= 0:
+            raise AggregationError(f'Invalid frequency: {freq}')
+        if (end - start).total_seconds() / (step * 4) > limit:
+            return None
+
+        bounds = pd.Series([0, 0], index=[start, end])
+        return len(bounds.resample(offset).size())
+
+    def _auto_freq(self, times, max_points):
+        for freq in self.TIME_BUCKETS:
+            buckets = self._bucket_count(times, freq, max_points)
+            if buckets is not None and buckets <= max_points:
+                return freq
+        return self.TIME_BUCKETS[-1]
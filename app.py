@@ -1,29 +1,20 @@
-from flask import Flask, request, render_template, redirect, url_for, jsonify, session
+from flask import Flask, Blueprint, current_app, request, render_template, redirect, url_for, jsonify, session
 import os
-import sys
 import json
 from datetime import datetime
+from functools import wraps
 from dotenv import load_dotenv
-from dbconnection import dbactivities
-import pandas as pd 
 from llama import LLM 
+from startup import StartupLoader
+from scheduler import QueryScheduler, SchedulerBusy
+from aggregation import ResultStore, AggregationError
 import time 
-import pymssql 
-from flask import session
+import uuid
 
 nv_path = os.path.join(os.path.dirname(__file__), 'config', '.env')
 load_dotenv(dotenv_path=nv_path)
 
-app = Flask(__name__, template_folder='templates', static_folder='static')
-app.secret_key = os.environ['FLASK_KEY']
-
-# Initialize components
-dbcon = dbactivities()
-llm_model = LLM() 
-
-# Get database schema
-db_schema = dbcon.index()
-print('SQL data fetched successfully')
+main = Blueprint('main', __name__)
 
 # Connection info
 connectionstring = {
@@ -38,6 +29,43 @@ current_query = ''
 current_table = 'nothing'
 time_difference = 0
 
+def get_loader():
+    """Background startup loader owning dbcon, db_schema and the model list"""
+    return current_app.extensions['querychakra']
+
+def get_scheduler():
+    """Admission control for query executions"""
+    return current_app.extensions['query_scheduler']
+
+def get_result_store():
+    """Server-side execution results backing the dashboard"""
+    return current_app.extensions['result_store']
+
+def get_session_id():
+    """Stable per-browser id used for scheduler fairness"""
+    if 'sid' not in session:
+        session['sid'] = uuid.uuid4().hex
+    return session['sid']
+
+def requires_schema(page=False):
+    """Answer 503 until the background loader has fetched the database schema"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            loader = get_loader()
+            if loader.schema_loaded:
+                return view(*args, **kwargs)
+
+            message = 'QueryChakra is still loading the database schema, please retry shortly.'
+            headers = {'Retry-After': '5'}
+            if page:
+                return render_template('error.html',
+                                     error_message=message,
+                                     db_data=connectionstring), 503, headers
+            return {'success': False, 'error': message, 'startup': loader.status()}, 503, headers
+        return wrapper
+    return decorator
+
 def get_conversation_history():
     """Get structured conversation history from session"""
     return session.get('conversation_history', [])
@@ -83,15 +111,33 @@ def format_history_for_llm():
     
     return "\n".join(formatted)
 
-@app.route('/')
+@main.route('/healthz')
+def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return {'status': 'ok'}
+
+@main.route('/readyz')
+def readyz():
+    """Readiness probe: schema loaded and model providers probed"""
+    status = get_loader().status()
+    return status, (200 if status['ready'] else 503)
+
+@main.route('/scheduler_stats')
+def scheduler_stats():
+    """Execution queue depth and wait times per database"""
+    return {'success': True, 'stats': get_scheduler().stats()}
+
+@main.route('/')
+@requires_schema(page=True)
 def index():
     """Main index page with enhanced model selection"""
-    normalized_data = json.dumps(db_schema)
+    loader = get_loader()
+    normalized_data = json.dumps(loader.db_schema)
     normalized_data = json.loads(normalized_data)
-    databases = dbcon.get_databases()
+    databases = loader.dbcon.get_databases()
     
-    # Get available models
-    available_models = llm_model.get_available_models()
+    # Model list probed at startup, refreshed through /get_models
+    available_models = loader.available_models
     
     # Get structured chat history
     chat_history = get_conversation_history()
@@ -105,7 +151,7 @@ def index():
         available_models=available_models
     )
 
-@app.route('/process_textarea', methods=['POST'])
+@main.route('/process_textarea', methods=['POST'])
 def process_textarea():
     """Process user query with selected model"""
     try:
@@ -129,7 +175,7 @@ def process_textarea():
         history = format_history_for_llm()
         
         # Generate query
-        response, time_taken = llm_model.generate_query(
+        response, time_taken, metrics = get_loader().llm_model.generate_query(
             schema, query, history, model_provider, model_name
         )
         
@@ -150,6 +196,7 @@ def process_textarea():
             'query': response, 
             'time': time_difference,
             'model_used': model_used,
+            'metrics': metrics,
             'history_entry': entry
         }
         
@@ -159,14 +206,14 @@ def process_textarea():
             'error': f'Processing error: {str(e)}'
         }, 500
 
-@app.route('/validate_query', methods=['POST'])
+@main.route('/validate_query', methods=['POST'])
 def validate_query():
     """Validate if query is database-related"""
     try:
         content = request.get_json()
         query = content.get('query', '')
         
-        is_valid, error_msg = llm_model.validate_query_intent(query)
+        is_valid, error_msg = get_loader().llm_model.validate_query_intent(query)
         
         return {
             'valid': is_valid,
@@ -179,11 +226,11 @@ def validate_query():
             'message': f'Validation error: {str(e)}'
         }, 500
 
-@app.route('/get_models')
+@main.route('/get_models')
 def get_models():
     """Get available models for both providers"""
     try:
-        available_models = llm_model.get_available_models()
+        available_models = get_loader().probe_providers()
         return {
             'success': True,
             'models': available_models
@@ -194,20 +241,22 @@ def get_models():
             'error': str(e)
         }, 500
 
-@app.route('/change_db', methods=['POST'])
+@main.route('/change_db', methods=['POST'])
+@requires_schema()
 def change_db():
     """Change database connection"""
     try:
         content = request.get_json()
         db = content['database']
-        global connectionstring, db_schema
+        global connectionstring
         
         if db == connectionstring['Database']:
             return {'status': 300, 'msg': 'no need to change'}
         else:
-            dbcon.switch_db(db)
+            loader = get_loader()
+            loader.dbcon.switch_db(db)
             connectionstring['Database'] = db
-            db_schema = dbcon.index()
+            loader.load_schema()
             # Clear history when switching databases
             session.pop('conversation_history', None)
             return {'status': 200, 'msg': 'changed successfully'}
@@ -215,7 +264,7 @@ def change_db():
     except Exception as e:
         return {'status': 600, 'msg': str(e)}
     
-@app.route('/clean_query', methods=['POST'])
+@main.route('/clean_query', methods=['POST'])
 def clean_query():
     """Clean and prepare query for execution"""
     try:
@@ -226,12 +275,13 @@ def clean_query():
     except Exception as e:
         return {'success': False, 'error': str(e)}, 500
 
-@app.route('/output_page')
+@main.route('/output_page')
+@requires_schema(page=True)
 def output_page():
     """Display query results"""
     try:
         if not current_query or current_query.strip() == '':
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         
         # Check if current_query is actually an SQL query
         if current_query.startswith("I can only help") or current_query.startswith("Error"):
@@ -239,8 +289,15 @@ def output_page():
                                  error_message=current_query,
                                  db_data=connectionstring)
         
-        table = json.loads(dbcon.query_outputs(current_query))
+        dbcon = get_loader().dbcon
+        scheduler = get_scheduler()
+        database = connectionstring['Database']
+        cost = scheduler.estimate(database, current_query, dbcon.estimate_cost, current_query)
+        df = scheduler.submit(database, get_session_id(), cost, dbcon.query_dataframe, current_query)
+        # Keep the typed frame for the dashboard, the table gets a stringified copy
         global current_table
+        result_id = get_result_store().put(df, current_query)
+        table = json.loads(dbcon.to_json(df.copy()))
         current_table = table
         
         columns = list(table.keys())
@@ -260,7 +317,14 @@ def output_page():
                              positions=indices, 
                              output=table, 
                              gpt_metadata={'tokens': 0, 'time_taken': time_difference}, 
-                             chat_history=chat_history)
+                             chat_history=chat_history,
+                             result_id=result_id)
+
+    except SchedulerBusy as e:
+        # Not the query's fault, leave the history entry as it is
+        return render_template('error.html',
+                             error_message=str(e),
+                             db_data=connectionstring), 429, {'Retry-After': str(e.retry_after)}
                              
     except Exception as e:
         # Update history entry status to error
@@ -274,16 +338,37 @@ def output_page():
                              error_message=f"Query execution failed: {str(e)}",
                              db_data=connectionstring)
 
-@app.route('/render_dashboard')
+@main.route('/render_dashboard')
 def render_dashboard():
-    """Render PyGWalker dashboard"""
+    """Render the dashboard for the latest execution result"""
+    result_id = request.args.get('result_id')
     try:
-        walker_html = "Dashboard feature is currently disabled."
-        return walker_html
+        if not result_id:
+            raise AggregationError('Run a query before opening the dashboard.')
+        summary = get_result_store().summary(result_id)
+        return render_template('dashboard.html', summary=summary, db_data=connectionstring)
+    except AggregationError as e:
+        return render_template('error.html',
+                             error_message=str(e),
+                             db_data=connectionstring), 404
     except Exception as e:
         return f"Dashboard generation failed: {str(e)}", 500
 
-@app.route('/history_management', methods=['GET', 'POST'])
+@main.route('/aggregate', methods=['POST'])
+def aggregate():
+    """Group-by, histogram, top-N or time-bucket slice of a stored result"""
+    try:
+        content = request.get_json() or {}
+        result_id = content.get('result_id')
+        if not result_id:
+            raise AggregationError('result_id is required.')
+        return {'success': True, 'data': get_result_store().aggregate(result_id, content)}
+    except AggregationError as e:
+        return {'success': False, 'error': str(e)}, 400
+    except Exception as e:
+        return {'success': False, 'error': f'Aggregation error: {str(e)}'}, 500
+
+@main.route('/history_management', methods=['GET', 'POST'])
 def history_management():
     """Manage conversation history"""
     if request.method == 'GET':
@@ -334,13 +419,13 @@ def history_management():
     
     return {'success': False, 'error': 'Invalid request'}, 400
 
-@app.route('/reset_history', methods=['GET', 'POST'])
+@main.route('/reset_history', methods=['GET', 'POST'])
 def reset_history():
     """Clear conversation history (backward compatibility)"""
     session.pop('conversation_history', None)
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/export_history')
+@main.route('/export_history')
 def export_history():
     """Export conversation history as JSON (backward compatibility)"""
     try:
@@ -360,19 +445,33 @@ def export_history():
         return {'success': False, 'error': str(e)}, 500
 
 # Error handlers
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found(error):
     return render_template('error.html', 
                          error_message="Page not found",
                          db_data=connectionstring), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def internal_error(error):
     return render_template('error.html', 
                          error_message="Internal server error",
                          db_data=connectionstring), 500
 
+def create_app():
+    """Build the Flask app and start loading the schema in the background"""
+    app = Flask(__name__, template_folder='templates', static_folder='static')
+    app.secret_key = os.environ['FLASK_KEY']
+    app.register_blueprint(main)
+
+    loader = StartupLoader(LLM())
+    app.extensions['querychakra'] = loader
+    app.extensions['query_scheduler'] = QueryScheduler()
+    app.extensions['result_store'] = ResultStore()
+    loader.start()
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
     port=int(os.environ.get('PORT', 5000))
     print("port",port)
     app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
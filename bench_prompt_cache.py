@@ -0,0 +1,43 @@
+"""Measure Ollama prompt-eval vs generation time for a cold and a warm model
+
+Usage: python bench_prompt_cache.py [model] [runs]
+
+The schema is crawled through dbactivities exactly as the app does. The model
+is unloaded first (keep_alive=0), so the first call pays model load plus the
+full schema prefix. Following calls only differ in the question, so with the
+prefix cached their prompt_eval_count should drop to the suffix tokens.
+"""
+import sys
+import ollama
+from dbconnection import dbactivities
+from llama import LLM
+
+QUESTIONS = [
+    'How many rows are in each table?',
+    'Show the 10 most recent records',
+    'Count distinct values of the first column of the largest table'
+]
+
+
+def main():
+    model_name = sys.argv[1] if len(sys.argv) > 1 else 'gemma3:1b'
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else len(QUESTIONS)
+
+    llm_model = LLM()
+    schema = llm_model.format_schema(dbactivities().index())
+
+    # Unload the model so the first call is a true cold start
+    ollama.generate(model=model_name, prompt='', keep_alive=0)
+
+    print(f"{'run':<6}{'load_ms':>10}{'prompt_tok':>12}{'prompt_ms':>12}{'eval_tok':>10}{'eval_ms':>10}{'total_s':>10}")
+    for run in range(runs):
+        question = QUESTIONS[run % len(QUESTIONS)]
+        _, time_taken, metrics = llm_model.generate_query(schema, question, '', 'ollama', model_name)
+        label = 'cold' if run == 0 else f'warm{run}'
+        print(f"{label:<6}{metrics.get('load_ms', 0):>10}{metrics.get('prompt_eval_count', 0):>12}"
+              f"{metrics.get('prompt_eval_ms', 0):>12}{metrics.get('eval_count', 0):>10}"
+              f"{metrics.get('eval_ms', 0):>10}{round(time_taken, 2):>10}")
+
+
+if __name__ == '__main__':
+    main()
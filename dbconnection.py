@@ -1,5 +1,4 @@
 import os
-import sys
 import pandas as pd
 from dotenv import load_dotenv
 import sqlalchemy
@@ -25,7 +24,7 @@ class dbactivities:
             print(f'Connection String :: {connection_string}')
         except Exception as e:
             print(f'Unable to establish a connection because of the below reason\n{e}')
-            sys.exit(1)
+            raise
         self.tables = []
         self.columns = []
         self.datatypes = []
@@ -54,7 +53,7 @@ class dbactivities:
             print(f'Connection String :: {connection_string}')
         except Exception as e:
             print(f'Unable to establish a connection because of the below reason\n{e}')
-            sys.exit(1)
+            raise
 
     def get_tables(self, database):
         # SQL query to fetch all table names from the database
@@ -88,8 +87,24 @@ class dbactivities:
         self.datatypes = tbltype
         return tblcolumns, tbltype
     
-    def query_outputs(self, query):
-        df = pd.read_sql(query, self.engine)
+    def estimate_cost(self, query):
+        """Rough number of rows examined according to EXPLAIN, None if it cannot be estimated"""
+        try:
+            with self.engine.connect() as connection:
+                result = connection.exec_driver_sql(f"EXPLAIN {query.strip().rstrip(';')}")
+                plan = result.mappings().all()
+        except Exception as e:
+            print(f'Unable to estimate query cost\n{e}')
+            return None
+        cost = 1
+        for row in plan:
+            cost *= max(int(row.get('rows') or 1), 1)
+        return cost
+
+    def query_dataframe(self, query):
+        return pd.read_sql(query, self.engine)
+
+    def to_json(self, df):
         def is_overflow(value):
             try:
                 json.dumps(value)
@@ -103,6 +118,9 @@ class dbactivities:
                         df.loc[i, col] = str(df.loc[i, col])
         convert_overflow_values(df)
         return df.to_json(date_format='iso') #default_handler=str
+
+    def query_outputs(self, query):
+        return self.to_json(self.query_dataframe(query))
     
 
     def index(self):
@@ -1,14 +1,14 @@
 import os
 import time 
 from dotenv import load_dotenv
-import ollama
-import requests
-from groq import Groq
 import re
 
 class LLM:
     def __init__(self):
-        # Enhanced prompt with strict DB focus and anti-hallucination measures
+        # Enhanced prompt with strict DB focus and anti-hallucination measures.
+        # Laid out for KV-cache reuse: the instructions and schema form a stable
+        # prefix (system message), the history and question a variable suffix
+        # (user message), so local models only re-evaluate the suffix per call.
         self.template = '''[INST] You are a specialized SQL query generator with STRICT limitations:
 
 CRITICAL RULES:
@@ -19,10 +19,6 @@ CRITICAL RULES:
 
 TASK: Given the user's natural language input and database schema, generate a precise SQL Server query.
 
-USER INPUT: {prompt}
-
-DATABASE SCHEMA: {schema}
-
 REQUIREMENTS:
 - Use SQL Server syntax ONLY
 - Reference ONLY the provided tables and columns
@@ -36,6 +32,10 @@ RESPOND WITH ONLY:
 2. OR clarification questions about the database query
 3. OR the decline message for non-DB topics
 
+DATABASE SCHEMA: {schema}'''
+
+        self.question_template = '''{history}USER INPUT: {prompt}
+
 [/INST]'''
         
         nv_path = os.path.join(os.path.dirname(__file__), 'config', '.env')
@@ -57,12 +57,25 @@ RESPOND WITH ONLY:
             ]
         }
         
-        # Initialize Groq client
+        # Keep Ollama models resident between requests so the schema prefix stays cached
+        self.keep_alive = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+        self.ollama_options = {
+            'temperature': 0.1,  # Low temperature for consistent SQL generation
+            'top_p': 0.9,
+            'stop': ['[INST]', '[/INST]']  # Stop tokens to prevent rambling
+        }
+
+        # Groq client is created on first use so startup does not import the SDK
         self.groq_api_key = os.environ.get('GROQ_API_KEY')
-        if self.groq_api_key:
-            self.groq_client = Groq(api_key=self.groq_api_key)
-        else:
-            self.groq_client = None
+        self._groq_client = None
+
+    @property
+    def groq_client(self):
+        """Lazily construct the Groq client (None when no API key is configured)"""
+        if self._groq_client is None and self.groq_api_key:
+            from groq import Groq
+            self._groq_client = Groq(api_key=self.groq_api_key)
+        return self._groq_client
 
     def get_available_models(self):
         """Return available models for both providers"""
@@ -70,6 +83,7 @@ RESPOND WITH ONLY:
         
         # Check Ollama models
         try:
+            import ollama
             ollama_response = ollama.list()
             print(f"Debug - Ollama response: {ollama_response}")  # Debug log
             
@@ -92,7 +106,7 @@ RESPOND WITH ONLY:
             available['ollama'] = []
         
         # Check Groq availability
-        if self.groq_client:
+        if self.groq_api_key:
             available['groq'] = self.models['groq']
         else:
             available['groq'] = []
@@ -124,70 +138,122 @@ RESPOND WITH ONLY:
         return True, None
 
     def generate_query(self, schema, query, history, model_provider, model_name):
-        """Generate SQL query using specified model and provider"""
+        """Generate SQL query using specified model and provider
+
+        Returns (response, seconds taken, timings); timings holds the provider's
+        prompt-eval vs generation figures, empty when unavailable.
+        """
         start_time = time.time()
         
         # Validate query intent first
         is_valid, error_msg = self.validate_query_intent(query)
         if not is_valid:
-            return error_msg, abs(time.time() - start_time)
+            return error_msg, abs(time.time() - start_time), {}
         
         try:
-            template = self.template.replace("{schema}", schema).replace("{prompt}", query)
+            messages = self.build_messages(schema, query, history)
             
             if model_provider == 'ollama':
-                return self._generate_with_ollama(template, history, model_name, start_time)
+                return self._generate_with_ollama(messages, model_name, start_time)
             elif model_provider == 'groq':
-                return self._generate_with_groq(template, history, model_name, start_time)
+                return self._generate_with_groq(messages, model_name, start_time)
             else:
-                return "Invalid model provider specified.", abs(time.time() - start_time)
+                return "Invalid model provider specified.", abs(time.time() - start_time), {}
                 
         except Exception as e:
-            return f"Error generating query: {str(e)}", abs(time.time() - start_time)
+            return f"Error generating query: {str(e)}", abs(time.time() - start_time), {}
 
-    def _generate_with_ollama(self, template, history, model_name, start_time):
+    def build_messages(self, schema, query, history=''):
+        """Split the prompt into a stable prefix and a per-request suffix"""
+        prefix = self.template.replace("{schema}", schema)
+        history_block = f"CONVERSATION HISTORY:\n{history}\n\n" if history else ""
+        suffix = self.question_template.replace("{history}", history_block).replace("{prompt}", query)
+        return [
+            {'role': 'system', 'content': prefix},
+            {'role': 'user', 'content': suffix}
+        ]
+
+    @staticmethod
+    def format_schema(db_schema):
+        """Render dbactivities.index() output the way the UI sends it to /process_textarea"""
+        combined = ""
+        for table, values in db_schema.items():
+            entry = values[0]
+            combined += f"schema: {entry['schema']}, table: {table}, columns: {entry['name']}, types: {entry['dtypes']}\n"
+        return combined
+
+    @staticmethod
+    def _ollama_metrics(chunk):
+        """Pull load / prompt-eval / generation timings (ns) out of the final Ollama chunk"""
+        def ms(key):
+            return round((chunk.get(key) or 0) / 1e6, 2)
+        return {
+            'load_ms': ms('load_duration'),
+            'prompt_eval_count': chunk.get('prompt_eval_count') or 0,
+            'prompt_eval_ms': ms('prompt_eval_duration'),
+            'eval_count': chunk.get('eval_count') or 0,
+            'eval_ms': ms('eval_duration'),
+            'total_ms': ms('total_duration')
+        }
+
+    def warm_up(self, schema, models=None):
+        """Load Ollama models and prime their KV cache with the schema prefix"""
+        import ollama
+
+        models = self.models['ollama'] if models is None else models
+        messages = self.build_messages(schema, 'SELECT 1')
+        results = {}
+        for model_name in models:
+            try:
+                response = ollama.chat(
+                    model=model_name,
+                    messages=messages,
+                    stream=False,
+                    keep_alive=self.keep_alive,
+                    options={**self.ollama_options, 'num_predict': 1}
+                )
+                results[model_name] = self._ollama_metrics(response)
+                print(f"Warmed up {model_name}: {results[model_name]}")
+            except Exception as e:
+                print(f"Warm-up failed for {model_name}: {e}")
+                results[model_name] = {'error': str(e)}
+        return results
+
+    def _generate_with_ollama(self, messages, model_name, start_time):
         """Generate query using Ollama"""
-        messages = []
-        if history:
-            messages.append({'role': 'system', 'content': history})
-        messages.append({'role': 'user', 'content': template})
-        
+        metrics = {}
         try:
+            import ollama
             stream = ollama.chat(
                 model=model_name,
                 messages=messages,
                 stream=True,
-                options={
-                    'temperature': 0.1,  # Low temperature for consistent SQL generation
-                    'top_p': 0.9,
-                    'stop': ['[INST]', '[/INST]']  # Stop tokens to prevent rambling
-                }
+                keep_alive=self.keep_alive,
+                options=self.ollama_options
             )
             
             response = ""
             for chunk in stream:
                 response += chunk['message']['content']
+                if chunk.get('done'):
+                    metrics = self._ollama_metrics(chunk)
                 
             # Post-process response to extract SQL
             response = self._post_process_response(response)
             
             end_time = time.time()
-            return response, abs(start_time - end_time)
+            return response, abs(start_time - end_time), metrics
             
         except Exception as e:
-            return f"Ollama error: {str(e)}", abs(time.time() - start_time)
+            return f"Ollama error: {str(e)}", abs(time.time() - start_time), metrics
 
-    def _generate_with_groq(self, template, history, model_name, start_time):
+    def _generate_with_groq(self, messages, model_name, start_time):
         """Generate query using Groq"""
+        metrics = {}
         if not self.groq_client:
-            return "Groq API key not configured.", abs(time.time() - start_time)
+            return "Groq API key not configured.", abs(time.time() - start_time), metrics
         
         try:
-            messages = []
-            if history:
-                messages.append({"role": "system", "content": history})
-            messages.append({"role": "user", "content": template})
-            
             chat_completion = self.groq_client.chat.completions.create(
                 messages=messages,
                 model=model_name,
@@ -198,13 +264,21 @@ RESPOND WITH ONLY:
             )
             
             response = chat_completion.choices[0].message.content
+            usage = getattr(chat_completion, 'usage', None)
+            if usage is not None:
+                metrics = {
+                    'prompt_eval_count': getattr(usage, 'prompt_tokens', 0),
+                    'prompt_eval_ms': round((getattr(usage, 'prompt_time', 0) or 0) * 1000, 2),
+                    'eval_count': getattr(usage, 'completion_tokens', 0),
+                    'eval_ms': round((getattr(usage, 'completion_time', 0) or 0) * 1000, 2)
+                }
             response = self._post_process_response(response)
             
             end_time = time.time()
-            return response, abs(start_time - end_time)
+            return response, abs(start_time - end_time), metrics
             
         except Exception as e:
-            return f"Groq error: {str(e)}", abs(time.time() - start_time)
+            return f"Groq error: {str(e)}", abs(time.time() - start_time), metrics
 
     def _post_process_response(self, response):
         """Post-process the response to clean up and validate"""
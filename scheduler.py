@@ -0,0 +1,204 @@
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SchedulerBusy(Exception):
+    """Raised when a query cannot be admitted; retry_after is a hint in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Lane:
+    """Queue and counters for a single database"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.heap = []
+        self.running = 0
+        self.session_rounds = {}
+        self.waits = deque(maxlen=500)
+        self.run_times = deque(maxlen=500)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+
+class QueryScheduler:
+    """Admission control in front of query executions
+
+    Each database gets at most max_concurrency executions at once. Further
+    requests wait in a priority queue ordered by cost class (small before
+    large), then by per-session round (the session's queued plus running
+    queries) so one session cannot crowd out the others, then by arrival.
+    Once max_queue requests are waiting new ones are rejected with a
+    retry-after hint.
+
+    State lives in the process: with several server workers each one applies
+    these limits on its own and reports its own stats.
+    """
+
+    PRIORITIES = {'small': 0, 'large': 1}
+
+    def __init__(self, max_concurrency=None, max_queue=None, small_cost=None, queue_timeout=None,
+                 max_estimates=None, estimate_cache_size=None):
+        self.max_concurrency = max_concurrency or int(os.environ.get('EXEC_MAX_CONCURRENCY', 4))
+        self.max_queue = max_queue or int(os.environ.get('EXEC_MAX_QUEUE', 32))
+        self.small_cost = small_cost or int(os.environ.get('EXEC_SMALL_COST_ROWS', 100000))
+        self.queue_timeout = queue_timeout or float(os.environ.get('EXEC_QUEUE_TIMEOUT', 60))
+        self.max_estimates = max_estimates or int(os.environ.get('EXEC_MAX_ESTIMATES', 2))
+        self.estimate_cache_size = estimate_cache_size or 256
+
+        self._lanes = {}
+        self._lanes_lock = threading.Lock()
+        self._sequence = itertools.count()
+
+        self._estimates = OrderedDict()
+        self._estimate_slots = {}
+        self._estimates_lock = threading.Lock()
+
+    def _lane(self, database):
+        with self._lanes_lock:
+            if database not in self._lanes:
+                self._lanes[database] = _Lane()
+            return self._lanes[database]
+
+    def classify(self, cost):
+        """Map an estimated row count to a priority class (unknown cost counts as large)"""
+        if cost is not None and cost <= self.small_cost:
+            return 'small'
+        return 'large'
+
+    def _retry_after(self, lane):
+        # Expected time for the queue ahead to drain, at least one second
+        average = sum(lane.run_times) / len(lane.run_times) if lane.run_times else 1.0
+        return max(1, math.ceil(average * (len(lane.heap) + 1) / self.max_concurrency))
+
+    def submit(self, database, session_id, cost, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once admitted and return its result"""
+        lane = self._lane(database)
+        priority = self.classify(cost)
+        enqueued_at = time.time()
+
+        with lane.condition:
+            if lane.running >= self.max_concurrency and len(lane.heap) >= self.max_queue:
+                lane.rejected += 1
+                raise SchedulerBusy(f'Too many queries queued for {database}, please retry shortly.',
+                                    self._retry_after(lane))
+
+            session_round = lane.session_rounds.get(session_id, 0)
+            lane.session_rounds[session_id] = session_round + 1
+            ticket = (self.PRIORITIES[priority], session_round, next(self._sequence), session_id)
+            heapq.heappush(lane.heap, ticket)
+
+            deadline = enqueued_at + self.queue_timeout
+            while lane.heap[0] != ticket or lane.running >= self.max_concurrency:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    lane.heap.remove(ticket)
+                    heapq.heapify(lane.heap)
+                    lane.timed_out += 1
+                    self._release_round(lane, session_id)
+                    lane.condition.notify_all()
+                    raise SchedulerBusy(f'Timed out waiting for a free {database} connection.',
+                                        self._retry_after(lane))
+                lane.condition.wait(remaining)
+
+            heapq.heappop(lane.heap)
+            lane.running += 1
+            lane.admitted += 1
+            lane.waits.append(time.time() - enqueued_at)
+            # The new head may have been woken and gone back to sleep before we
+            # were admitted; wake it so it can take any remaining free slot
+            lane.condition.notify_all()
+
+        started_at = time.time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with lane.condition:
+                lane.running -= 1
+                lane.run_times.append(time.time() - started_at)
+                # Rounds cover running queries too, so a session is only
+                # relieved of its turn once the query has finished
+                self._release_round(lane, session_id)
+                lane.condition.notify_all()
+
+    def estimate(self, database, query, fn, *args, **kwargs):
+        """Cost estimate for query via fn, cached per query text and bounded per database
+
+        Estimating runs EXPLAIN, which needs a connection of its own, so at most
+        max_estimates of them run at once for a database.
+        """
+        key = (database, query)
+        with self._estimates_lock:
+            if key in self._estimates:
+                self._estimates.move_to_end(key)
+                return self._estimates[key]
+            if database not in self._estimate_slots:
+                self._estimate_slots[database] = threading.BoundedSemaphore(self.max_estimates)
+            slots = self._estimate_slots[database]
+
+        if not slots.acquire(timeout=self.queue_timeout):
+            raise SchedulerBusy(f'Too many queries being planned for {database}, please retry shortly.', 1)
+        try:
+            cost = fn(*args, **kwargs)
+        finally:
+            slots.release()
+
+        # A failed EXPLAIN yields None; retry next time rather than pin the query as large
+        if cost is None:
+            return cost
+        with self._estimates_lock:
+            self._estimates[key] = cost
+            while len(self._estimates) > self.estimate_cache_size:
+                self._estimates.popitem(last=False)
+        return cost
+
+    @staticmethod
+    def _release_round(lane, session_id):
+        remaining = lane.session_rounds.get(session_id, 1) - 1
+        if remaining > 0:
+            lane.session_rounds[session_id] = remaining
+        else:
+            lane.session_rounds.pop(session_id, None)
+
+    def stats(self):
+        """Queue depth and wait times per database"""
+        def percentile(values, fraction):
+            if not values:
+                return 0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+        result = {}
+        with self._lanes_lock:
+            lanes = dict(self._lanes)
+        for database, lane in lanes.items():
+            with lane.condition:
+                waits = list(lane.waits)
+                run_times = list(lane.run_times)
+                result[database] = {
+                    'running': lane.running,
+                    'queued': len(lane.heap),
+                    'queued_small': sum(1 for ticket in lane.heap if ticket[0] == self.PRIORITIES['small']),
+                    'admitted': lane.admitted,
+                    'rejected': lane.rejected,
+                    'timed_out': lane.timed_out,
+                    'wait_avg': round(sum(waits) / len(waits), 4) if waits else 0,
+                    'wait_p95': round(percentile(waits, 0.95), 4),
+                    'wait_max': round(max(waits), 4) if waits else 0,
+                    'run_avg': round(sum(run_times) / len(run_times), 4) if run_times else 0
+                }
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'small_cost': self.small_cost,
+            'databases': result
+        }
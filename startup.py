@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+import traceback
+
+
+class StartupLoader:
+    """Loads the database schema and probes model providers in the background
+
+    Importing dbconnection pulls in pandas and SQLAlchemy and index() crawls
+    INFORMATION_SCHEMA, so all of it runs on a daemon thread. The web process
+    can answer /healthz straight away and /readyz once this has finished.
+    """
+
+    def __init__(self, llm_model, retry_interval=None):
+        self.llm_model = llm_model
+        self.retry_interval = retry_interval or float(os.environ.get('STARTUP_RETRY_SECONDS', 10))
+
+        self.dbcon = None
+        self.db_schema = {}
+        self.available_models = {'ollama': [], 'groq': []}
+        self.warm_up_results = {}
+
+        self.schema_loaded = False
+        self.providers_probed = False
+        self.error = None
+        self.attempts = 0
+        self.started_at = time.time()
+        self.schema_loaded_at = None
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._probe_thread = None
+
+    def start(self):
+        """Start the background loader (no-op if it is already running)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='querychakra-startup', daemon=True)
+            self._thread.start()
+            # Provider discovery does not depend on the database and the Ollama
+            # client has no timeout, so a hanging host must not hold up the schema
+            self._probe_thread = threading.Thread(target=self.probe_providers, name='querychakra-probe', daemon=True)
+            self._probe_thread.start()
+
+    def _run(self):
+        while not self.schema_loaded:
+            self.attempts += 1
+            try:
+                self.load_schema()
+            except Exception as e:
+                self.error = f'{type(e).__name__}: {e}'
+                print(f'Schema load attempt {self.attempts} failed, retrying in {self.retry_interval}s\n{e}')
+                traceback.print_exc()
+                time.sleep(self.retry_interval)
+
+    def load_schema(self):
+        """Connect to the database (first call only) and crawl the schema"""
+        if self.dbcon is None:
+            # Deferred: pulls in pandas and SQLAlchemy
+            from dbconnection import dbactivities
+            self.dbcon = dbactivities()
+
+        db_schema = self.dbcon.index()
+        with self._lock:
+            self.db_schema = db_schema
+            self.schema_loaded = True
+            self.schema_loaded_at = time.time()
+            self.error = None
+            # Warm up only once the model list is known, otherwise probe_providers() does it
+            warm = self.providers_probed
+        print(f'SQL data fetched successfully in {round(self.schema_loaded_at - self.started_at, 2)}s')
+        if warm:
+            self.warm_up()
+        return db_schema
+
+    def warm_up(self):
+        """Pre-load the available Ollama models with the current schema prefix"""
+        models = self.available_models.get('ollama', [])
+        if not models or os.environ.get('OLLAMA_WARM_UP', '1') == '0':
+            return
+        schema = self.llm_model.format_schema(self.db_schema)
+
+        def run():
+            self.warm_up_results = self.llm_model.warm_up(schema, models)
+
+        threading.Thread(target=run, name='querychakra-warm-up', daemon=True).start()
+
+    def probe_providers(self):
+        """Refresh the cached list of available models"""
+        try:
+            available = self.llm_model.get_available_models()
+        except Exception as e:
+            print(f'Model provider probe failed: {e}')
+            available = {'ollama': [], 'groq': []}
+        with self._lock:
+            # First probe finishing after the schema load triggers the deferred warm-up
+            warm = not self.providers_probed and self.schema_loaded
+            self.available_models = available
+            self.providers_probed = True
+        if warm:
+            self.warm_up()
+        return available
+
+    def is_ready(self):
+        return self.schema_loaded and self.providers_probed
+
+    def status(self):
+        """Readiness details for /readyz"""
+        return {
+            'ready': self.is_ready(),
+            'schema_loaded': self.schema_loaded,
+            'providers_probed': self.providers_probed,
+            'attempts': self.attempts,
+            'uptime': round(time.time() - self.started_at, 3),
+            'schema_load_time': round(self.schema_loaded_at - self.started_at, 3) if self.schema_loaded_at else None,
+            'warm_up': self.warm_up_results,
+            'error': self.error
+        }
@@ -0,0 +1,105 @@
+// QueryChakra dashboard: charts are drawn from server-side aggregates, never raw rows
+let dashboardChart = null;
+
+$(document).ready(function() {
+    const columns = dashboardSummary.columns;
+
+    Object.keys(columns).forEach(function(name) {
+        $("#dash-column").append(new Option(`${name} (${columns[name].kind})`, name));
+        if (columns[name].kind === 'numeric') {
+            $("#dash-value").append(new Option(name, name));
+        }
+    });
+
+    // Pick a sensible first chart from the column kinds
+    const datetimeColumn = Object.keys(columns).find(name => columns[name].kind === 'datetime');
+    const categoricalColumn = Object.keys(columns).find(name => columns[name].kind === 'categorical');
+    if (datetimeColumn) {
+        $("#dash-op").val('timeseries');
+        $("#dash-column").val(datetimeColumn);
+    } else if (categoricalColumn) {
+        $("#dash-op").val('topn');
+        $("#dash-column").val(categoricalColumn);
+    } else {
+        $("#dash-op").val('histogram');
+    }
+
+    $("#dash-render").on('click', renderChart);
+    renderChart();
+});
+
+function buildRequest() {
+    const op = $("#dash-op").val();
+    const column = $("#dash-column").val();
+    const request = {
+        'result_id': dashboardSummary.result_id,
+        'op': op,
+        'limit': parseInt($("#dash-limit").val(), 10) || 20
+    };
+
+    if (op === 'groupby') {
+        request.by = column;
+        request.column = $("#dash-value").val() || null;
+    } else {
+        request.column = column;
+        request.value = $("#dash-value").val() || null;
+    }
+    if (op === 'timeseries') {
+        delete request.limit;
+    }
+    if ($("#dash-agg").val()) {
+        request.agg = $("#dash-agg").val();
+    }
+    return request;
+}
+
+function renderChart() {
+    $("#dash-error").addClass('hidden');
+
+    $.ajax({
+        url: "/aggregate",
+        type: "POST",
+        contentType: "application/json",
+        data: JSON.stringify(buildRequest()),
+        success: function(response) {
+            drawChart(response.data);
+        },
+        error: function(jqXHR) {
+            const message = (jqXHR.responseJSON && jqXHR.responseJSON.error) || 'Aggregation failed';
+            $("#dash-error").text(message).removeClass('hidden');
+        }
+    });
+}
+
+function drawChart(data) {
+    if (dashboardChart) {
+        dashboardChart.destroy();
+    }
+
+    dashboardChart = new Chart(document.getElementById('dash-chart'), {
+        type: data.op === 'timeseries' ? 'line' : 'bar',
+        data: {
+            labels: data.labels,
+            datasets: [{
+                label: $("#dash-column").val(),
+                data: data.values,
+                backgroundColor: '#3b82f6',
+                borderColor: '#1d4ed8',
+                pointRadius: 0
+            }]
+        },
+        options: {
+            animation: false,
+            plugins: { legend: { display: false } }
+        }
+    });
+
+    let meta = `${data.points} points from ${data.rows} rows in ${data.elapsed_ms} ms`;
+    if (data.freq) {
+        meta += ` (bucket: ${data.freq})`;
+    }
+    if (data.other) {
+        meta += ` (other: ${data.other})`;
+    }
+    $("#dash-meta").text(meta);
+}
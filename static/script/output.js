@@ -9,21 +9,11 @@ $(document).ready(function() {
         columns.adjust()
         .responsive.recalc();
 });
-function openNewTab(htmlContent) {
-    const newTab = window.open('', '_blank');
-    newTab.document.open();
-    newTab.document.write(htmlContent);
-    newTab.document.close();
-    }
 const openModalButton = document.getElementById('chartbutton');
 
-openModalButton.addEventListener('click', async () => {
-      try {
-            const response = await fetch('/render_dashboard');
-            const htmlString = await response.text();
-            openNewTab(htmlString);
-        } catch (error) {
-            console.error('Error fetching HTML:', error);
-        }
+openModalButton.addEventListener('click', () => {
+      // Dashboard works on server-side aggregates of the latest result
+      const resultId = openModalButton.dataset.resultId;
+      window.open(`/render_dashboard?result_id=${encodeURIComponent(resultId)}`, '_blank');
 });
 $(".navbar").removeClass('sticky');
\ No newline at end of file
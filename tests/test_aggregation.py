@@ -0,0 +1,127 @@
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from aggregation import AggregationError, ResultStore
+
+
+@pytest.fixture
+def store():
+    return ResultStore(max_points=500)
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'category': ['a', 'b', 'a', 'c', 'a', 'b'],
+        'amount': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        'created': pd.date_range('2024-01-01', periods=6, freq='D')
+    })
+
+
+def test_put_leaves_callers_decimals_untouched(store):
+    df = pd.DataFrame({'price': [Decimal('12345678901234567.89'), Decimal('1.50')]})
+    result_id = store.put(df)
+
+    assert isinstance(df['price'][0], Decimal)
+    assert store.summary(result_id)['columns']['price']['kind'] == 'numeric'
+
+
+def test_summary_is_precomputed(store, frame):
+    summary = store.summary(store.put(frame))
+
+    assert summary['rows'] == 6
+    assert summary['columns']['amount']['max'] == 6.0
+    assert summary['columns']['category']['distinct'] == 3
+    assert summary['columns']['created']['min'] == '2024-01-01T00:00:00'
+
+
+def test_groupby_and_topn(store, frame):
+    result_id = store.put(frame)
+
+    grouped = store.aggregate(result_id, {'op': 'groupby', 'by': 'category', 'column': 'amount', 'agg': 'sum'})
+    assert grouped['labels'] == ['a', 'b', 'c']
+    assert grouped['values'] == [9.0, 8.0, 4.0]
+
+    top = store.aggregate(result_id, {'op': 'topn', 'column': 'category', 'n': 1})
+    assert top['labels'] == ['a']
+    assert top['other'] == 3
+
+
+def test_histogram(store, frame):
+    result = store.aggregate(store.put(frame), {'op': 'histogram', 'column': 'amount', 'bins': 5})
+
+    assert sum(result['values']) == 6
+    assert result['points'] == 5
+
+
+def test_auto_bucket_keeps_first_timestamp(store):
+    df = pd.DataFrame({'t': pd.date_range('2024-01-01', periods=501, freq='s')})
+    result = store.aggregate(store.put(df), {'op': 'timeseries', 'column': 't'})
+
+    assert result['points'] <= 500
+    assert result['labels'][0] == '2024-01-01T00:00:00'
+    assert sum(result['values']) == 501
+
+
+def test_explicit_bucket_over_limit_is_rejected(store, frame):
+    with pytest.raises(AggregationError):
+        store.aggregate(store.put(frame), {'op': 'timeseries', 'column': 'created', 'freq': 'h', 'limit': 10})
+
+
+@pytest.mark.parametrize('params', [
+    {'op': 'timeseries', 'column': 'created', 'agg': 'sum'},
+    {'op': 'groupby', 'by': 'category', 'agg': 'mean'},
+    {'op': 'groupby', 'by': 'created', 'column': 'category', 'agg': 'mean'},
+    {'op': 'topn', 'column': 'created', 'value': 'category', 'agg': 'min'},
+    {'op': 'histogram', 'column': 'category'},
+    {'op': 'groupby', 'by': 'missing'},
+    {'op': 'pivot'}
+])
+def test_invalid_requests_raise_aggregation_error(store, frame, params):
+    with pytest.raises(AggregationError):
+        store.aggregate(store.put(frame), params)
+
+
+def test_date_objects_are_treated_as_datetime(store):
+    from datetime import date
+    df = pd.DataFrame({'d': [date(2024, 1, 1), date(2024, 1, 2), None]})
+    result_id = store.put(df)
+
+    assert store.summary(result_id)['columns']['d']['kind'] == 'datetime'
+    assert sum(store.aggregate(result_id, {'op': 'timeseries', 'column': 'd'})['values']) == 2
+
+
+def test_auto_bucket_over_long_span_is_fast(store):
+    import time
+    df = pd.DataFrame({'t': pd.date_range('2015-01-01', '2025-01-01', periods=1_000_000)})
+    result_id = store.put(df)
+
+    started = time.time()
+    result = store.aggregate(result_id, {'op': 'timeseries', 'column': 't'})
+    assert time.time() - started < 1.0
+    assert result['freq'] == 'MS'
+    assert sum(result['values']) == 1_000_000
+
+
+def test_fine_bucket_over_long_span_is_rejected_cheaply(store):
+    import time
+    df = pd.DataFrame({'t': pd.to_datetime(['2015-01-01', '2025-01-01'])})
+    result_id = store.put(df)
+
+    started = time.time()
+    with pytest.raises(AggregationError):
+        store.aggregate(result_id, {'op': 'timeseries', 'column': 't', 'freq': 's'})
+    assert time.time() - started < 0.5
+
+
+@pytest.mark.parametrize('by', [[['category']], [{'a': 1}], 5, {'category': 1}])
+def test_non_string_group_keys_are_rejected(store, frame, by):
+    with pytest.raises(AggregationError):
+        store.aggregate(store.put(frame), {'op': 'groupby', 'by': by})
@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scheduler import QueryScheduler, SchedulerBusy
+
+
+def run_in_thread(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    return thread
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('condition not reached')
+        time.sleep(0.005)
+
+
+def test_freed_slots_admit_every_queued_query():
+    # Regression: admitting the head must wake the next head, otherwise
+    # queued work is serialized although slots are free
+    for _ in range(10):
+        scheduler = QueryScheduler(max_concurrency=4, queue_timeout=10)
+        release = threading.Event()
+        blockers = [run_in_thread(scheduler.submit, 'db', f'b{i}', None, release.wait) for i in range(4)]
+        wait_for(lambda: scheduler.stats()['databases']['db']['running'] == 4)
+
+        started = []
+        queued = [run_in_thread(scheduler.submit, 'db', f'q{i}', None,
+                                lambda: (started.append(time.time()), time.sleep(0.3)))
+                  for i in range(4)]
+        wait_for(lambda: scheduler.stats()['databases']['db']['queued'] == 4)
+
+        released_at = time.time()
+        release.set()
+        for thread in blockers + queued:
+            thread.join()
+
+        assert len(started) == 4
+        assert max(started) - released_at < 0.2
+
+
+def test_small_queries_and_other_sessions_go_first():
+    scheduler = QueryScheduler(max_concurrency=1, small_cost=10, queue_timeout=10)
+    release = threading.Event()
+    order = []
+
+    blocker = run_in_thread(scheduler.submit, 'db', 'hold', None, release.wait)
+    wait_for(lambda: scheduler.stats()['databases']['db']['running'] == 1)
+
+    threads = []
+    for name, session_id, cost in [('A1', 'A', None), ('A2', 'A', None), ('B1', 'B', None), ('S', 'C', 1)]:
+        threads.append(run_in_thread(scheduler.submit, 'db', session_id, cost, order.append, name))
+        wait_for(lambda: scheduler.stats()['databases']['db']['queued'] == len(threads))
+
+    release.set()
+    for thread in [blocker] + threads:
+        thread.join()
+
+    assert order == ['S', 'A1', 'B1', 'A2']
+
+
+def test_running_query_counts_against_its_session():
+    scheduler = QueryScheduler(max_concurrency=1, queue_timeout=10)
+    release = threading.Event()
+    order = []
+
+    # A is running; its next query must queue behind B's first one
+    blocker = run_in_thread(scheduler.submit, 'db', 'A', None, release.wait)
+    wait_for(lambda: scheduler.stats()['databases']['db']['running'] == 1)
+    a2 = run_in_thread(scheduler.submit, 'db', 'A', None, order.append, 'A2')
+    wait_for(lambda: scheduler.stats()['databases']['db']['queued'] == 1)
+    b1 = run_in_thread(scheduler.submit, 'db', 'B', None, order.append, 'B1')
+    wait_for(lambda: scheduler.stats()['databases']['db']['queued'] == 2)
+
+    release.set()
+    for thread in (blocker, a2, b1):
+        thread.join()
+
+    assert order == ['B1', 'A2']
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = QueryScheduler(max_concurrency=1, max_queue=1, queue_timeout=10)
+    release = threading.Event()
+
+    blocker = run_in_thread(scheduler.submit, 'db', 'A', None, release.wait)
+    wait_for(lambda: scheduler.stats()['databases']['db']['running'] == 1)
+    queued = run_in_thread(scheduler.submit, 'db', 'B', None, lambda: None)
+    wait_for(lambda: scheduler.stats()['databases']['db']['queued'] == 1)
+
+    with pytest.raises(SchedulerBusy) as error:
+        scheduler.submit('db', 'C', None, lambda: None)
+    assert error.value.retry_after >= 1
+
+    release.set()
+    blocker.join()
+    queued.join()
+    assert scheduler.stats()['databases']['db']['rejected'] == 1
+
+
+def test_queue_timeout_releases_the_ticket():
+    scheduler = QueryScheduler(max_concurrency=1, queue_timeout=0.05)
+    release = threading.Event()
+
+    blocker = run_in_thread(scheduler.submit, 'db', 'A', None, release.wait)
+    wait_for(lambda: scheduler.stats()['databases']['db']['running'] == 1)
+    with pytest.raises(SchedulerBusy):
+        scheduler.submit('db', 'B', None, lambda: None)
+
+    release.set()
+    blocker.join()
+    stats = scheduler.stats()['databases']['db']
+    assert stats['queued'] == 0
+    assert stats['timed_out'] == 1
+    assert scheduler.submit('db', 'B', None, lambda: 'ok') == 'ok'
+
+
+def test_estimates_are_cached_per_query():
+    scheduler = QueryScheduler()
+    calls = []
+
+    def explain(query):
+        calls.append(query)
+        return 42
+
+    assert scheduler.estimate('db', 'SELECT 1', explain, 'SELECT 1') == 42
+    assert scheduler.estimate('db', 'SELECT 1', explain, 'SELECT 1') == 42
+    assert scheduler.estimate('other', 'SELECT 1', explain, 'SELECT 1') == 42
+    assert calls == ['SELECT 1', 'SELECT 1']
+
+
+def test_estimates_are_bounded_per_database():
+    scheduler = QueryScheduler(max_estimates=2, queue_timeout=5)
+    release = threading.Event()
+    active = []
+    peak = []
+
+    def explain(query):
+        active.append(query)
+        peak.append(len(active))
+        release.wait()
+        active.remove(query)
+        return 1
+
+    threads = [run_in_thread(scheduler.estimate, 'db', f'q{i}', explain, f'q{i}') for i in range(5)]
+    wait_for(lambda: len(active) == 2)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+
+
+def test_failed_estimates_are_not_cached():
+    scheduler = QueryScheduler()
+    results = [None, 7]
+
+    def explain(query):
+        return results.pop(0)
+
+    assert scheduler.estimate('db', 'SELECT 1', explain, 'SELECT 1') is None
+    assert scheduler.estimate('db', 'SELECT 1', explain, 'SELECT 1') == 7